@@ -1,7 +1,20 @@
+import bisect
+import csv
+import io
 import os
-from flask import Flask, render_template, request, redirect, session, jsonify
-from pymongo import MongoClient
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import click
+import orjson
+from flask import Flask, render_template, stream_template, request, redirect, session, jsonify
+from flask.json.provider import DefaultJSONProvider
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
+from bson.errors import InvalidId
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from dotenv import load_dotenv
@@ -9,33 +22,110 @@ from dotenv import load_dotenv
 load_dotenv()  # loads variables from .env into environment
 
 # ---------------- FLASK APP SETUP ----------------
+class OrjsonProvider(DefaultJSONProvider):
+    # orjson (C, SIMD) for jsonify / tojson / session cookies; unknown types fall back to Flask's default()
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get("SECRET_KEY")  # use secret from .env
 
 MONGO_URI = os.environ.get("MONGO_URI_ATLAS")
-client = MongoClient(MONGO_URI)
+MONGO_MAX_POOL_SIZE = 50
+# warm pool so bursts after idle skip the TLS handshake; zstd comes from pymongo[zstd], zlib is the fallback.
+# connect=False: no monitor threads or pool connections until first use, so importing the app
+# (and forking gunicorn --preload workers) does no I/O and each worker opens its own topology
+client = MongoClient(
+    MONGO_URI,
+    connect=False,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=5,
+    maxIdleTimeMS=60000,
+    serverSelectionTimeoutMS=2000,
+    retryWrites=True,
+    compressors="zstd,zlib"
+)
 db = client.get_database()  # will now pick 'college_portal' from URI
 
-# TEST CONNECTION
-try:
-    client.admin.command("ping")
-    print("MongoDB Atlas connected ✅")
-except Exception as e:
-    print("MongoDB connection failed ❌", e)
-
 students = db["students"]
 results = db["results"]
 queries = db["queries"]
 attendance = db["attendance"]
 admins = db["admins"]
 
-# ---------------- SAFE ADMIN SETUP ----------------
-if not admins.find_one({"email": "admin@gmail.com"}):
-    admins.insert_one({
-        "email": "admin@gmail.com",
-        "password": generate_password_hash("admin@1234"),
-        "role": "admin"
-    })
+# shared pool for firing independent DB calls concurrently within a request.
+# one thread per pooled connection: a student summary takes 4, so about 12
+# concurrent fan-outs run before work queues, the same point the pool saturates
+db_executor = ThreadPoolExecutor(max_workers=MONGO_MAX_POOL_SIZE)
+
+# ---------------- INDEXES ----------------
+# case-insensitive email matching that still uses the index (no $regex scan)
+EMAIL_COLLATION = {"locale": "en", "strength": 2}
+
+INDEXES = [
+    (admins, "email", {"unique": True, "collation": EMAIL_COLLATION, "name": "email_ci"}),
+    (students, "register_no", {"unique": True}),
+    (students, "email", {"unique": True, "collation": EMAIL_COLLATION, "name": "email_ci"}),
+    (results, [("register_no", 1), ("semester", 1)], {}),
+    (attendance, [("register_no", 1), ("semester", 1), ("subject", 1)], {"unique": True}),
+    (queries, [("register_no", 1), ("created_at", -1)], {}),
+    (queries, "status", {})
+]
+
+# ---------------- PASSWORDS ----------------
+# explicit PBKDF2 cost for new hashes instead of werkzeug's default (scrypt).
+# existing hashes still verify; only pbkdf2 hashes with fewer iterations are
+# rewritten on login, scrypt or costlier pbkdf2 hashes are left as they are
+PASSWORD_HASH_ITERATIONS = 260000
+PASSWORD_HASH_METHOD = f"pbkdf2:sha256:{PASSWORD_HASH_ITERATIONS}"
+
+def hash_password(password):
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+def needs_rehash(password_hash):
+    method = password_hash.split("$", 1)[0].split(":")
+    if method[0] != "pbkdf2":
+        return False
+    try:
+        return int(method[2]) < PASSWORD_HASH_ITERATIONS
+    except (IndexError, ValueError):
+        return False
+
+# ---------------- DATABASE SETUP ----------------
+# run once per deploy (`flask --app app init-db`), not on every import / worker boot
+@app.cli.command("init-db")
+def init_db():
+    # failures raise ClickException so the command exits non-zero and the deploy stops
+    try:
+        client.admin.command("ping")
+        print("MongoDB Atlas connected ✅")
+    except Exception as e:
+        raise click.ClickException(f"MongoDB connection failed ❌ {e}")
+
+    failures = 0
+    for collection, keys, options in INDEXES:
+        try:
+            collection.create_index(keys, **options)
+        except Exception as e:
+            failures += 1
+            print("MongoDB index creation failed ❌", collection.name, keys, e)
+
+    # single upsert: no read first, and safe to re-run
+    admins.update_one(
+        {"email": "admin@gmail.com"},
+        {"$setOnInsert": {
+            "password": hash_password("admin@1234"),
+            "role": "admin"
+        }},
+        upsert=True
+    )
+    if failures:
+        raise click.ClickException(f"{failures} index(es) failed to build; see messages above")
+    print("Database initialised ✅")
 
 # ---------------- CONSTANTS ----------------
 GRADE_POINTS = {
@@ -43,16 +133,66 @@ GRADE_POINTS = {
     "B": 6, "C": 5, "U": 0, "W": 0
 }
 
+# fields the templates actually render (never ship password hashes)
+STUDENT_FIELDS = {
+    "_id": 0, "register_no": 1, "name": 1, "email": 1,
+    "department": 1, "batch": 1, "dob": 1, "gender": 1
+}
+RESULT_FIELDS = {
+    "_id": 0, "semester": 1, "total_credits": 1, "gpa": 1, "final_result": 1,
+    "subjects.code": 1, "subjects.name": 1, "subjects.credit": 1,
+    "subjects.grade": 1, "subjects.attendance_grade": 1, "subjects.result": 1
+}
+ATTENDANCE_FIELDS = {
+    "_id": 0, "semester": 1, "subject": 1,
+    "total_classes": 1, "attended_classes": 1, "attendance_percentage": 1
+}
+QUERY_FIELDS = {"_id": 0, "query_type": 1, "message": 1, "reply": 1, "status": 1}
+
+# students per department, grouped server-side
+DEPARTMENT_COUNTS = {"$group": {
+    "_id": {"$ifNull": ["$department", "N/A"]},
+    "student_count": {"$sum": 1}
+}}
+
+FAIL_GRADES = frozenset(("U", "W"))
+
+# attendance grade bands: <75 U, 75-85 S, 85-95 M, >=95 O
+ATTENDANCE_THRESHOLDS = (75, 85, 95)
+ATTENDANCE_LETTERS = ("U", "S", "M", "O")
+
 def attendance_grade(p):
     p = float(p)
-    if p >= 95:
-        return "O"
-    elif p >= 85:
-        return "M"
-    elif p >= 75:
-        return "S"
-    else:
+    if p != p:  # NaN compares false everywhere; keep the old "U"
         return "U"
+    return ATTENDANCE_LETTERS[bisect.bisect_right(ATTENDANCE_THRESHOLDS, p)]
+
+def read_csv_upload():
+    file = request.files.get("file")
+    if not file or not file.filename:
+        return None
+    return list(csv.DictReader(io.TextIOWrapper(file.stream, encoding="utf-8-sig")))
+
+# ---------------- CACHE ----------------
+# short-lived cache for the dashboard/report/landing stats; cleared on every write
+stats_cache = TTLCache(maxsize=64, ttl=30)
+stats_lock = threading.Lock()
+
+def clear_stats_cache():
+    with stats_lock:
+        stats_cache.clear()
+
+# per-student summary data keyed by register_no; repeat visits within the TTL
+# reuse one fetch
+student_cache = TTLCache(maxsize=1024, ttl=10)
+student_lock = threading.Lock()
+
+def clear_student_cache(reg=None):
+    with student_lock:
+        if reg is None:
+            student_cache.clear()
+        else:
+            student_cache.pop(hashkey(reg), None)
 
 # ---------------- ADMIN ROUTES ----------------
 @app.route("/admin", methods=["GET", "POST"])
@@ -60,33 +200,34 @@ def admin_login():
     if request.method == "POST":
         email = request.form["email"]
         password = request.form["password"]
-        admin = admins.find_one({"email": email})
+        admin = admins.find_one({"email": email}, {"_id": 0, "email": 1, "password": 1}, collation=EMAIL_COLLATION)
         if admin and check_password_hash(admin["password"], password):
+            if needs_rehash(admin["password"]):
+                admins.update_one({"email": admin["email"]}, {"$set": {"password": hash_password(password)}})
             session["admin"] = admin["email"]
             return redirect("/admin/dashboard")
         return "Invalid Admin Login"
     return render_template("admin_login.html")
 
+@cached(stats_cache, key=partial(hashkey, "department_counts"), lock=stats_lock)
+def department_counts():
+    return list(students.aggregate([
+        {"$project": {"_id": 0, "department": 1}},
+        DEPARTMENT_COUNTS,
+        # $group output order is unspecified; keep chart labels stable
+        {"$sort": {"_id": 1}}
+    ]))
+
 @app.route("/admin/dashboard")
 def admin_dashboard():
     if "admin" not in session:
         return redirect("/admin")
 
-    all_students = list(students.find())
-
     # SAME departments logic as admin_reports
-    departments = {}
-    for s in all_students:
-        dept = s.get("department", "N/A")
-        departments[dept] = departments.get(dept, 0) + 1
-
-    department_students = [
-        {"_id": k, "student_count": v}
-        for k, v in departments.items()
-    ]
+    department_students = department_counts()
 
-    total_students = len(all_students)
-    total_queries = queries.count_documents({})
+    total_students = students.estimated_document_count()
+    total_queries = queries.estimated_document_count()
     total_departments = len(department_students)
     
 
@@ -104,25 +245,43 @@ def admin_add_student():
     if "admin" not in session:
         return redirect("/admin")
     if request.method == "POST":
-        register_no = request.form["register_no"]
-        email = request.form["email"]
-        if students.find_one({"$or":[{"register_no": register_no}, {"email": email}]}):
+        # the unique register_no / email indexes reject duplicates; no pre-check read needed
+        try:
+            students.insert_one({
+                "register_no": request.form["register_no"],
+                "name": request.form["name"],
+                "email": request.form["email"],
+                "password": hash_password(request.form["password"]),
+                "department": request.form["department"],
+                "batch": request.form["batch"],
+                "dob": request.form["dob"],
+                "gender": request.form["gender"]
+            })
+        except DuplicateKeyError:
             return "Student already exists"
-        students.insert_one({
-            "register_no": register_no,
-            "name": request.form["name"],
-            "email": email,
-            "password": generate_password_hash(request.form["password"]),
-            "department": request.form["department"],
-            "batch": request.form["batch"],
-            "dob": request.form["dob"],
-            "gender": request.form["gender"]
-        })
+        clear_stats_cache()
         return redirect("/admin/add-student")
-    all_students = list(students.find())
-    for s in all_students:
-        s["_id"] = str(s["_id"])
-    return render_template("admin_add_student.html", students=all_students)
+    # stream rows to the browser as cursor batches arrive instead of materialising the collection
+    all_students = students.find({}, STUDENT_FIELDS, batch_size=500)
+    return stream_template("admin_add_student.html", students=all_students)
+
+def attendance_op(reg, dept, semester, subject, total_classes, attended_classes):
+    attendance_percentage = round((attended_classes / total_classes) * 100, 2) if total_classes > 0 else 0
+    return UpdateOne(
+        {"register_no": reg, "semester": semester, "subject": subject},
+        {"$set": {
+            "department": dept,
+            "total_classes": total_classes,
+            "attended_classes": attended_classes,
+            "attendance_percentage": attendance_percentage
+        }},
+        upsert=True
+    )
+
+# single-row form and CSV upload share this path: one round-trip for any number of rows,
+# each an upsert on the unique (register_no, semester, subject) index
+def apply_attendance(ops):
+    return attendance.bulk_write(ops, ordered=False, bypass_document_validation=False)
 
 @app.route("/admin/attendance", methods=["GET","POST"])
 def admin_attendance():
@@ -130,25 +289,43 @@ def admin_attendance():
         return redirect("/admin")
     if request.method == "POST":
         reg = request.form["register_no"]
-        dept = request.form["department"]
-        semester = request.form["semester"]
-        subject = request.form["subject"]
-        total_classes = int(request.form["total"])
-        attended_classes = int(request.form["attended"])
-        attendance_percentage = round((attended_classes / total_classes) * 100, 2) if total_classes > 0 else 0
-        attendance.update_one(
-            {"register_no": reg, "semester": semester, "subject": subject},
-            {"$set": {
-                "department": dept,
-                "total_classes": total_classes,
-                "attended_classes": attended_classes,
-                "attendance_percentage": attendance_percentage
-            }},
-            upsert=True
-        )
+        apply_attendance([attendance_op(
+            reg,
+            request.form["department"],
+            request.form["semester"],
+            request.form["subject"],
+            int(request.form["total"]),
+            int(request.form["attended"])
+        )])
+        clear_stats_cache()
+        clear_student_cache(reg)
         return "Attendance uploaded successfully"
     return render_template("admin_attendance.html")
 
+# CSV columns: register_no, department, semester, subject, total, attended
+@app.route("/admin/attendance/bulk", methods=["POST"])
+def admin_attendance_bulk():
+    if "admin" not in session:
+        return redirect("/admin")
+    try:
+        # decoding happens while reading, so a non-UTF-8 file fails inside this try
+        rows = read_csv_upload()
+        if rows is None:
+            return "No CSV file uploaded"
+        ops = [
+            attendance_op(row["register_no"], row["department"], row["semester"], row["subject"],
+                          int(row["total"]), int(row["attended"]))
+            for row in rows
+        ]
+    except (KeyError, ValueError, TypeError, UnicodeDecodeError, csv.Error):
+        return "Invalid CSV file"
+    if not ops:
+        return "No rows found in CSV"
+    apply_attendance(ops)
+    clear_stats_cache()
+    clear_student_cache()
+    return f"{len(ops)} attendance records uploaded successfully"
+
 @app.route("/get-student-department/<register_no>")
 def get_student_department(register_no):
     student = students.find_one({"register_no": register_no}, {"_id": 0, "department": 1})
@@ -167,28 +344,80 @@ def get_student_attendance(register_no, semester, subject):
 def admin_delete_student(register_no):
     if "admin" not in session:
         return redirect("/admin")
-    students.delete_one({"register_no": register_no})
-    results.delete_many({"register_no": register_no})
-    attendance.delete_many({"register_no": register_no})
+    # independent collections: run the three deletes concurrently (one RTT of wall-clock)
+    futures = [
+        db_executor.submit(students.delete_one, {"register_no": register_no}),
+        db_executor.submit(results.delete_many, {"register_no": register_no}),
+        db_executor.submit(attendance.delete_many, {"register_no": register_no})
+    ]
+    for f in futures:
+        f.result()
+    clear_stats_cache()
+    clear_student_cache(register_no)
     return redirect("/admin/add-student")
 
 @app.route("/admin/edit-profile/<register_no>", methods=["GET","POST"])
 def admin_edit_profile(register_no):
     if "admin" not in session:
         return redirect("/admin")
-    student = students.find_one({"register_no": register_no})
     if request.method == "POST":
-        students.update_one({"register_no": register_no}, {"$set": {
-            "name": request.form["name"],
-            "email": request.form["email"],
-            "department": request.form["department"],
-            "batch": request.form.get("batch", student.get("batch")),
-            "dob": request.form.get("dob", student.get("dob")),
-            "gender": request.form.get("gender", student.get("gender"))
-        }})
+        # pipeline update keeps existing batch/dob/gender when the form omits them,
+        # so no find_one is needed; $literal stops "$..." input being read as a field path
+        try:
+            students.update_one({"register_no": register_no}, [{"$set": {
+                "name": {"$literal": request.form["name"]},
+                "email": {"$literal": request.form["email"]},
+                "department": {"$literal": request.form["department"]},
+                "batch": {"$ifNull": [{"$literal": request.form.get("batch")}, "$batch"]},
+                "dob": {"$ifNull": [{"$literal": request.form.get("dob")}, "$dob"]},
+                "gender": {"$ifNull": [{"$literal": request.form.get("gender")}, "$gender"]}
+            }}])
+        except DuplicateKeyError:
+            return "Student already exists"
+        clear_stats_cache()
+        clear_student_cache(register_no)
         return redirect("/admin/add-student")
+    student = students.find_one({"register_no": register_no}, STUDENT_FIELDS)
     return render_template("admin_edit_profile.html", student=student)
 
+def build_result(reg, sem, rows):
+    # rows: dicts with code, name, grade, credit, att for one student/semester
+    subjects = []
+    total_points = 0
+    total_credits = 0
+    overall_pass = True
+    grade_point_of = GRADE_POINTS.get
+    for row in rows:
+        grade = row["grade"].strip().upper()
+        credit = int(row["credit"])
+        att = float(row["att"])
+        grade_point = grade_point_of(grade, 0)
+        att_grade = attendance_grade(att)
+        result_status = "FAIL" if grade in FAIL_GRADES else "PASS"
+        if result_status == "FAIL": overall_pass = False
+        subjects.append({
+            "code": row["code"],
+            "name": row["name"],
+            "credit": credit,
+            "grade": grade,
+            "grade_point": grade_point,
+            "attendance_percentage": att,
+            "attendance_grade": att_grade,
+            "result": result_status
+        })
+        total_points += grade_point * credit
+        total_credits += credit
+    gpa = round(total_points / total_credits, 2) if total_credits>0 else 0
+    final_result = "PASS" if overall_pass else "FAIL"
+    return {
+        "register_no": reg,
+        "semester": sem,
+        "subjects": subjects,
+        "total_credits": total_credits,
+        "gpa": gpa,
+        "final_result": final_result
+    }
+
 @app.route("/admin/upload", methods=["GET","POST"])
 def upload_result():
     if "admin" not in session:
@@ -196,79 +425,96 @@ def upload_result():
     if request.method == "POST":
         reg = request.form["register_no"]
         sem = int(request.form["semester"])
-        subjects = []
-        total_points = 0
-        total_credits = 0
-        overall_pass = True
+        rows = []
         for i in range(1, 6):
             code = request.form.get(f"code{i}")
             if code:
-                name = request.form[f"name{i}"]
-                grade = request.form[f"grade{i}"].strip().upper()
-                credit = int(request.form[f"credit{i}"])
-                att = float(request.form[f"att{i}"])
-                grade_point = GRADE_POINTS.get(grade, 0)
-                att_grade = attendance_grade(att)
-                result_status = "FAIL" if grade in ["U","W"] else "PASS"
-                if result_status == "FAIL": overall_pass = False
-                subjects.append({
+                rows.append({
                     "code": code,
-                    "name": name,
-                    "credit": credit,
-                    "grade": grade,
-                    "grade_point": grade_point,
-                    "attendance_percentage": att,
-                    "attendance_grade": att_grade,
-                    "result": result_status
+                    "name": request.form[f"name{i}"],
+                    "grade": request.form[f"grade{i}"],
+                    "credit": request.form[f"credit{i}"],
+                    "att": request.form[f"att{i}"]
                 })
-                total_points += grade_point * credit
-                total_credits += credit
-        gpa = round(total_points / total_credits, 2) if total_credits>0 else 0
-        final_result = "PASS" if overall_pass else "FAIL"
-        results.insert_one({
-            "register_no": reg,
-            "semester": sem,
-            "subjects": subjects,
-            "total_credits": total_credits,
-            "gpa": gpa,
-            "final_result": final_result
-        })
+        results.insert_one(build_result(reg, sem, rows))
+        clear_stats_cache()
+        clear_student_cache(reg)
         return "Result Uploaded Successfully"
     return render_template("admin_upload_result.html")
 
+# CSV columns: register_no, semester, code, name, grade, credit, att (one row per subject)
+@app.route("/admin/upload/bulk", methods=["POST"])
+def upload_result_bulk():
+    if "admin" not in session:
+        return redirect("/admin")
+    grouped = {}
+    try:
+        # decoding happens while reading, so a non-UTF-8 file fails inside this try
+        rows = read_csv_upload()
+        if rows is None:
+            return "No CSV file uploaded"
+        for row in rows:
+            grouped.setdefault((row["register_no"], int(row["semester"])), []).append(row)
+        docs = [build_result(reg, sem, subject_rows) for (reg, sem), subject_rows in grouped.items()]
+    # short rows come back from DictReader with None for the missing columns
+    except (KeyError, ValueError, TypeError, AttributeError, UnicodeDecodeError, csv.Error):
+        return "Invalid CSV file"
+    if not docs:
+        return "No rows found in CSV"
+    results.insert_many(docs, ordered=False)
+    clear_stats_cache()
+    clear_student_cache()
+    return f"{len(docs)} Results Uploaded Successfully"
+
 @app.route("/admin/update-student/<register_no>", methods=["POST"])
 def admin_update_student(register_no):
     if "admin" not in session:
         return redirect("/admin")
-    students.update_one(
-        {"register_no": register_no},
-        {"$set": {
-            "name": request.form["name"],
-            "email": request.form["email"],
-            "department": request.form["department"],
-            "batch": request.form["batch"],
-            "dob": request.form["dob"],
-            "gender": request.form["gender"]
-        }}
-    )
+    try:
+        students.update_one(
+            {"register_no": register_no},
+            {"$set": {
+                "name": request.form["name"],
+                "email": request.form["email"],
+                "department": request.form["department"],
+                "batch": request.form["batch"],
+                "dob": request.form["dob"],
+                "gender": request.form["gender"]
+            }}
+        )
+    except DuplicateKeyError:
+        return "Student already exists"
+    clear_stats_cache()
+    clear_student_cache(register_no)
     return redirect("/admin/add-student")
 
-@app.route("/admin/reports")
-def admin_report():
-    if "admin" not in session:
-        return redirect("/admin")
-    all_students = list(students.find())
+@cached(stats_cache, key=partial(hashkey, "admin_report"), lock=stats_lock)
+def admin_report_data():
+    # per-student lookups in one aggregate, streamed as a cursor so no single
+    # output document has to hold the whole report (16 MB BSON limit)
+    cursor = students.aggregate([
+        {"$lookup": {"from": "attendance", "localField": "register_no",
+                     "foreignField": "register_no",
+                     "pipeline": [{"$limit": 1}, {"$project": {"_id": 1}}], "as": "att"}},
+        {"$lookup": {"from": "results", "localField": "register_no",
+                     "foreignField": "register_no",
+                     "pipeline": [{"$project": {
+                         "_id": 0, "semester": 1, "subjects.name": 1, "subjects.grade": 1,
+                         "subjects.attendance_grade": 1, "subjects.result": 1
+                     }}], "as": "res"}},
+        {"$lookup": {"from": "queries", "localField": "register_no",
+                     "foreignField": "register_no",
+                     "pipeline": [{"$limit": 1}, {"$project": {"status": 1}}], "as": "q"}},
+        {"$project": {
+            "_id": 0, "register_no": 1, "name": 1, "department": 1,
+            "attendance_posted": {"$gt": [{"$size": "$att"}, 0]},
+            "res": 1, "q.status": 1
+        }}
+    ], batch_size=500)
     report = []
-    departments = {}
-    for s in all_students:
-        reg = s["register_no"]
-        name = s["name"]
-        dept = s.get("department", "N/A")
-        student_attendance = list(attendance.find({"register_no": reg}))
-        attendance_posted = len(student_attendance) > 0
-        student_results = list(results.find({"register_no": reg}))
+    for s in cursor:
         result_summary = []
-        for r in student_results:
+        for r in s["res"]:
             for sub in r.get("subjects", []):
                 result_summary.append({
                     "semester": r.get("semester"),
@@ -277,20 +523,24 @@ def admin_report():
                     "attendance_grade": sub.get("attendance_grade"),
                     "result": sub.get("result")
                 })
-        departments[dept] = departments.get(dept, 0) + 1
-        student_query = queries.find_one({"register_no": reg})
-        query_status = student_query.get("status", "Pending") if student_query else None
+        query_status = s["q"][0].get("status", "Pending") if s["q"] else None
         report.append({
-            "register_no": reg,
-            "name": name,
-            "department": dept,
-            "attendance_posted": attendance_posted,
+            "register_no": s["register_no"],
+            "name": s["name"],
+            "department": s.get("department", "N/A"),
+            "attendance_posted": s["attendance_posted"],
             "result_summary": result_summary,
             "query_status": query_status
         })
-    department_students = [{"_id": k, "student_count": v} for k, v in departments.items()]
-    total_students = len(all_students)
-    total_queries = queries.count_documents({})
+    return report, department_counts()
+
+@app.route("/admin/reports")
+def admin_report():
+    if "admin" not in session:
+        return redirect("/admin")
+    report, department_students = admin_report_data()
+    total_students = len(report)
+    total_queries = queries.estimated_document_count()
     return render_template(
         "admin_reports.html",
         report=report,
@@ -304,8 +554,13 @@ def admin_queries():
     if "admin" not in session:
         return redirect("/admin")
     all_queries = list(queries.find().sort("created_at", -1))
+    regs = list({q["register_no"] for q in all_queries})
+    student_map = {
+        s["register_no"]: s
+        for s in students.find({"register_no": {"$in": regs}}, {"_id":0, "register_no":1, "department":1, "batch":1})
+    }
     for q in all_queries:
-        student = students.find_one({"register_no": q["register_no"]}, {"_id":0, "department":1, "batch":1})
+        student = student_map.get(q["register_no"])
         q["department"] = student.get("department","N/A") if student else "N/A"
         q["batch"] = student.get("batch","N/A") if student else "N/A"
     return render_template("admin_queries.html", queries=all_queries)
@@ -317,19 +572,36 @@ def admin_reply(id):
     reply_text = request.form.get("reply")
     if not reply_text:
         return "Reply cannot be empty"
-    queries.update_one({"_id": ObjectId(id)}, {"$set":{"reply": reply_text, "status": "Replied"}})
+    try:
+        query_id = ObjectId(id)
+    except InvalidId:
+        return "Query not found", 404
+    # the register_no comes back with the update, so no extra find_one is needed to invalidate
+    query = queries.find_one_and_update(
+        {"_id": query_id},
+        {"$set":{"reply": reply_text, "status": "Replied"}},
+        projection={"_id": 0, "register_no": 1}
+    )
+    if query is None:
+        return "Query not found", 404
+    clear_stats_cache()
+    clear_student_cache(query["register_no"])
     return redirect("/admin/queries")
 
 # ---------------- STUDENT ROUTES ----------------
 @app.route("/student/register", methods=["GET","POST"])
 def student_register():
     if request.method == "POST":
-        students.insert_one({
-            "register_no": request.form["register_no"],
-            "name": request.form["name"],
-            "email": request.form["email"],
-            "password": generate_password_hash(request.form["password"])
-        })
+        try:
+            students.insert_one({
+                "register_no": request.form["register_no"],
+                "name": request.form["name"],
+                "email": request.form["email"],
+                "password": hash_password(request.form["password"])
+            })
+        except DuplicateKeyError:
+            return "Student already exists"
+        clear_stats_cache()
         return redirect("/student/login")
     return render_template("student_register.html")
 
@@ -338,66 +610,69 @@ def student_login():
     if request.method == "POST":
         email = request.form["email"]
         password = request.form["password"]
-        s = students.find_one({"email": email})
+        s = students.find_one({"email": email}, {"_id": 0, "register_no": 1, "password": 1}, collation=EMAIL_COLLATION)
         if s and check_password_hash(s["password"], password):
+            if needs_rehash(s["password"]):
+                students.update_one({"register_no": s["register_no"]}, {"$set": {"password": hash_password(password)}})
             session["reg"] = s["register_no"]
             return redirect("/student/dashboard")
         return "Invalid Student Login"
     return render_template("student_login.html")
 
+def student_results_overview(reg):
+    # results sorted by semester, average GPA and subject names in one aggregate
+    data = next(results.aggregate([
+        {"$match": {"register_no": reg}},
+        {"$facet": {
+            "avg": [{"$group": {"_id": None, "gpa": {"$avg": "$gpa"}}}],
+            "subjects": [{"$unwind": "$subjects"}, {"$project": {"_id": 0, "name": "$subjects.name"}}],
+            "full": [{"$sort": {"semester": 1}}, {"$project": RESULT_FIELDS}]
+        }}
+    ]))
+    avg_gpa = round(data["avg"][0]["gpa"] or 0, 2) if data["avg"] else 0
+    subjects = [sub.get("name") for sub in data["subjects"]]
+    return data["full"], avg_gpa, subjects
+
+@cached(student_cache, lock=student_lock)
+def student_overview(reg):
+    # independent reads: fan out so latency is the slowest call, not the sum
+    student_f = db_executor.submit(students.find_one, {"register_no": reg}, STUDENT_FIELDS)
+    results_f = db_executor.submit(student_results_overview, reg)
+    attendance_f = db_executor.submit(lambda: list(attendance.find({"register_no": reg}, ATTENDANCE_FIELDS)))
+    queries_f = db_executor.submit(lambda: list(queries.find({"register_no": reg}, QUERY_FIELDS)))
+    all_results, avg_gpa, subjects = results_f.result()
+    student_attendance = attendance_f.result()
+    student_queries = queries_f.result()
+    return {
+        "student": student_f.result(),
+        "all_results": all_results,
+        "attendance": student_attendance,
+        "queries": student_queries,
+        "pending_queries": sum(1 for q in student_queries if q.get("status") == "Pending"),
+        "avg_gpa": avg_gpa,
+        "attendance_count": len(student_attendance),
+        "subjects": subjects
+    }
+
 @app.route("/student/dashboard")
 def student_dashboard():
     if "reg" not in session:
         return redirect("/student/login")
-    reg = session["reg"]
-    student = students.find_one({"register_no": reg})
-    all_results = list(results.find({"register_no": reg}))
-    student_attendance = list(attendance.find({"register_no": reg}))
-    student_queries = list(queries.find({"register_no": reg}))
-    pending_queries = queries.count_documents({"register_no": reg, "status":"Pending"})
-    avg_gpa = round(sum(r["gpa"] for r in all_results)/len(all_results),2) if all_results else 0
-    subjects = [sub["name"] for r in all_results for sub in r.get("subjects", [])] if all_results else []
-    return render_template("student_dashboard.html",
-                           student=student,
-                           all_results=all_results,
-                           attendance=student_attendance,
-                           queries=student_queries,
-                           pending_queries=pending_queries,
-                           avg_gpa=avg_gpa,
-                           attendance_count=len(student_attendance),
-                           subjects=subjects)
+    student = students.find_one({"register_no": session["reg"]}, STUDENT_FIELDS)
+    return render_template("student_dashboard.html", student=student)
 
 @app.route("/student/summary")
 def student_summary():
     if "reg" not in session:
         return redirect("/student/login")
-    reg = session["reg"]
-    student = students.find_one({"register_no": reg})
-    all_results = list(results.find({"register_no": reg}))
-    student_attendance = list(attendance.find({"register_no": reg}))
-    student_queries = list(queries.find({"register_no": reg}))
-    pending_queries = queries.count_documents({"register_no": reg, "status": "Pending"})
-    avg_gpa = round(sum(r["gpa"] for r in all_results)/len(all_results), 2) if all_results else 0
-    cgpa = avg_gpa
-    subjects = [sub["name"] for r in all_results for sub in r.get("subjects", [])] if all_results else []
-    return render_template(
-        "student_summary.html",
-        student=student,
-        all_results=all_results,
-        attendance=student_attendance,
-        queries=student_queries,
-        pending_queries=pending_queries,
-        avg_gpa=avg_gpa,
-        cgpa=cgpa,
-        attendance_count=len(student_attendance),
-        subjects=subjects
-    )
+    data = student_overview(session["reg"])
+    return render_template("student_summary.html", cgpa=data["avg_gpa"], **data)
 
 @app.route("/student/profile")
 def student_profile():
     if "reg" not in session:
         return redirect("/student/login")
-    student = students.find_one({"register_no": session["reg"]})
+    student = students.find_one({"register_no": session["reg"]}, STUDENT_FIELDS)
     return render_template("student_profile.html", student=student)
 
 @app.route("/student/result")
@@ -405,8 +680,8 @@ def student_result():
     if "reg" not in session:
         return redirect("/student/login")
     reg = session["reg"]
-    student = students.find_one({"register_no": reg})
-    all_results = list(results.find({"register_no": reg}).sort("semester",1))
+    student = students.find_one({"register_no": reg}, STUDENT_FIELDS)
+    all_results = list(results.find({"register_no": reg}, RESULT_FIELDS).sort("semester",1))
     cgpa = round(sum(r["gpa"] for r in all_results)/len(all_results),2) if all_results else 0
     return render_template("student_result.html", student=student, all_results=all_results, cgpa=cgpa)
 
@@ -414,21 +689,21 @@ def student_result():
 def student_attendance():
     if "reg" not in session:
         return redirect("/student/login")
-    data = list(attendance.find({"register_no": session["reg"]}))
+    data = list(attendance.find({"register_no": session["reg"]}, ATTENDANCE_FIELDS))
     return render_template("student_attendance.html", data=data)
 
 @app.route("/student/queries")
 def student_queries():
     if "reg" not in session:
         return redirect("/student/login")
-    data = list(queries.find({"register_no": session["reg"]}))
+    data = list(queries.find({"register_no": session["reg"]}, QUERY_FIELDS))
     return render_template("student_queries.html", queries=data)
 
 @app.route("/student/query", methods=["GET","POST"])
 def student_query():
     if "reg" not in session:
         return redirect("/student/login")
-    student = students.find_one({"register_no": session["reg"]})
+    student = students.find_one({"register_no": session["reg"]}, STUDENT_FIELDS)
     if request.method == "POST":
         queries.insert_one({
             "register_no": student["register_no"],
@@ -438,15 +713,28 @@ def student_query():
             "reply": "",
             "status": "Pending"
         })
+        clear_stats_cache()
+        clear_student_cache(student["register_no"])
         return "Query sent successfully"
     return render_template("student_query.html")
 
 # ---------------- OTHER ROUTES ----------------
+@cached(stats_cache, key=partial(hashkey, "landing_counts"), lock=stats_lock)
+def landing_counts():
+    total_students = students.estimated_document_count()
+    counts = next(results.aggregate([
+        {"$facet": {
+            "pass": [{"$match": {"final_result": "PASS"}}, {"$count": "n"}],
+            "fail": [{"$match": {"final_result": "FAIL"}}, {"$count": "n"}]
+        }}
+    ]))
+    pass_count = counts["pass"][0]["n"] if counts["pass"] else 0
+    fail_count = counts["fail"][0]["n"] if counts["fail"] else 0
+    return total_students, pass_count, fail_count
+
 @app.route("/")
 def index():
-    total_students = students.count_documents({})
-    pass_count = results.count_documents({"final_result":"PASS"})
-    fail_count = results.count_documents({"final_result":"FAIL"})
+    total_students, pass_count, fail_count = landing_counts()
     return render_template("index.html",
                            total_students=total_students,
                            pass_count=pass_count,
@@ -460,7 +748,11 @@ def logout():
 
 @app.route("/test-insert")
 def test_insert():
-    students.insert_one({"register_no": "999", "name": "Test", "email": "test@test.com"})
+    try:
+        students.insert_one({"register_no": "999", "name": "Test", "email": "test@test.com"})
+    except DuplicateKeyError:
+        return "Student already exists"
+    clear_stats_cache()
     return "Inserted Test Student ✅"
 
 